@@ -1,56 +1,188 @@
 import os
-from datetime import datetime
+import csv
+import logging
+import uuid
+from contextlib import contextmanager, ExitStack
+from datetime import datetime, timezone
 from functools import wraps
-from flask import Flask, render_template, request, jsonify, redirect, url_for, session, flash
-from werkzeug.security import generate_password_hash, check_password_hash
+from itertools import chain
+import click
+from flask.json.provider import JSONProvider
+from flask import Flask, render_template, request, redirect, url_for, session, flash, g, stream_with_context, abort
+from werkzeug.security import check_password_hash
+from argon2 import PasswordHasher
+from argon2.exceptions import VerificationError, InvalidHashError
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event, select, insert, update, exists, bindparam, case, or_, and_, true, lambda_stmt
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import joinedload, raiseload
+from sqlalchemy.dialects import sqlite
+from flask_caching import Cache
+from flask_session import Session
+import redis
 from dotenv import load_dotenv
+import orjson
+import ijson
 
 load_dotenv()
 
+# Handler log sekali di level modul agar app.logger.error(...) di blok except benar-benar tercatat
+logging.basicConfig(level=os.environ.get('LOG_LEVEL', 'INFO'))
+
+class OrjsonProvider(JSONProvider):
+    """JSON provider Flask berbasis orjson: dipakai request.get_json(), jsonify(), dan serializer
+    session cookie. datetime naive dianggap UTC, sama seperti response API (fast_json)."""
+    option = orjson.OPT_NAIVE_UTC | orjson.OPT_NON_STR_KEYS
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, option=self.option).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # Langsung bytes dari orjson, tanpa decode ke str lalu encode ulang
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj, option=self.option), mimetype='application/json')
+
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 # Ganti dengan secret key yang kuat, bisa dari environment variable
 app.config['SECRET_KEY'] = os.environ.get('FLASK_SECRET_KEY', 'ganti-dengan-kunci-rahasia-yang-kuat-dan-unik')
 
 # --- Konfigurasi Database MySQL ---
 db_user = os.environ.get('MYSQL_USER', 'root') # Default 'root'
 db_password = os.environ.get('MYSQL_PASSWORD') # WAJIB diatur di environment
-# !!! DEBUGGING: Cetak nilai db_password yang dibaca !!!
-print(f"DEBUG: MYSQL_PASSWORD dibaca sebagai: '{db_password}'") 
-# !!! END DEBUGGING !!!
 db_host = os.environ.get('MYSQL_HOST', 'localhost') # Default 'localhost'
 db_name = os.environ.get('MYSQL_DATABASE', 'inventory_db') # Default 'inventory_db'
 
+# DATABASE_URL (opsional) menggantikan seluruh URI MySQL, mis. sqlite:// untuk test suite di tests/
+database_url = os.environ.get('DATABASE_URL')
+
 # Ubah pengecekan: Hanya error jika variabel TIDAK ADA (None), izinkan string kosong ''
-if db_password is None:
+if db_password is None and not database_url:
     raise ValueError("Environment variable MYSQL_PASSWORD tidak diatur! Pastikan ada di file .env atau environment sistem.")
 
-app.config['SQLALCHEMY_DATABASE_URI'] = f'mysql+mysqlconnector://{db_user}:{db_password}@{db_host}/{db_name}'
+# Driver mysqlclient (MySQLdb, C extension) jauh lebih cepat dibanding mysql-connector murni Python
+app.config['SQLALCHEMY_DATABASE_URI'] = database_url or f'mysql+mysqldb://{db_user}:{db_password}@{db_host}/{db_name}?charset=utf8mb4'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Pool koneksi: pakai ulang koneksi antar request, cek koneksi basi sebelum dipakai,
+# dan recycle di bawah wait_timeout default MySQL (300 detik)
+# Ukuran pool per proses: sesuaikan dengan jumlah thread per worker (gunicorn --threads),
+# total koneksi = worker x (pool_size + max_overflow) harus di bawah max_connections MySQL
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+    'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
+    'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 20)),
+    'pool_use_lifo': True, # Pakai ulang koneksi yang baru dipakai; koneksi lebih sedikit tetap hangat
+    # Pre-ping menambah satu round-trip ping per checkout; boleh dimatikan (DB_POOL_PRE_PING=0)
+    # bila pool_recycle sudah di bawah wait_timeout dan server DB jarang restart/failover
+    'pool_pre_ping': os.environ.get('DB_POOL_PRE_PING', '1').lower() not in ('0', 'false', 'no'),
+    'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 280)),
+    'pool_timeout': 5,
+    # executemany INSERT (bulk transaksi, import-inventory) dikirim per 1000 baris per statement.
+    # mysqlclient sudah menulis ulang executemany INSERT menjadi VALUES multi-baris; opsi ini
+    # berlaku untuk jalur insertmanyvalues SQLAlchemy (dialek dengan RETURNING, mis. MariaDB/SQLite)
+    'insertmanyvalues_page_size': 1000,
+}
+if app.config['SQLALCHEMY_DATABASE_URI'].startswith('mysql'):
+    # NOW() dari server_default/onupdate harus UTC, sama seperti data lama (datetime.utcnow)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS']['connect_args'] = {'init_command': "SET time_zone = '+00:00'"}
 
 db = SQLAlchemy(app)
 # --- End Konfigurasi Database ---
 
-# Tambahkan context processor untuk menyediakan fungsi now() ke semua template
+# --- Konfigurasi Cache ---
+# Pakai Redis jika REDIS_URL diatur (dibagi antar worker), selain itu cache in-memory per proses
+redis_url = os.environ.get('REDIS_URL')
+if redis_url:
+    app.config['CACHE_TYPE'] = 'RedisCache'
+    app.config['CACHE_REDIS_URL'] = redis_url
+else:
+    app.config['CACHE_TYPE'] = 'SimpleCache'
+app.config['CACHE_DEFAULT_TIMEOUT'] = 60
+# Versi user (lihat get_user_version) hanya bisa dipercaya jika cache dibagi semua worker;
+# SimpleCache per proses tidak melihat bump dari worker lain
+USER_VERSION_CACHE_SHARED = app.config['CACHE_TYPE'] == 'RedisCache'
+
+cache = Cache(app)
+# Key cache respons API yang sering dibaca; dihapus setiap ada perubahan InventoryItem/Transaction
+INVENTORY_CACHE_KEY = 'inv:list'
+DASHBOARD_CACHE_KEY = 'dash:summary'
+
+LOW_STOCK_THRESHOLD = int(os.environ.get('LOW_STOCK_THRESHOLD', 10)) # Item dengan stok di bawah ini dihitung 'stok menipis'
+# --- End Konfigurasi Cache ---
+
+# --- Konfigurasi Session ---
+# Dengan Redis, cookie hanya berisi session id; data session['user'] disimpan di server
+# dan dibagi antar worker. Tanpa REDIS_URL tetap memakai cookie bertanda tangan bawaan Flask.
+if redis_url:
+    app.config['SESSION_TYPE'] = 'redis'
+    app.config['SESSION_REDIS'] = redis.from_url(redis_url)
+    Session(app)
+# --- End Konfigurasi Session ---
+
+# Tambahkan context processor untuk menyediakan fungsi now() dan role user ke semua template
 @app.context_processor
 def utility_processor():
-    return dict(now=datetime.now)
+    # g.current_user diisi authenticate_session (via login_required/role_required); halaman publik (login/register) tidak punya role
+    current_user = g.get('current_user')
+    return dict(now=datetime.now, user_role=current_user['role'] if current_user else None)
+
+# --- Hash Password ---
+# Argon2id (memory-hard, implementasi C) menggantikan default pbkdf2 Werkzeug.
+# Biaya bisa dinaikkan lewat env seiring hardware; hash lama di-upgrade otomatis saat login berikutnya
+password_hasher = PasswordHasher(
+    time_cost=int(os.environ.get('ARGON2_TIME_COST', 3)),
+    memory_cost=int(os.environ.get('ARGON2_MEMORY_COST', 65536)), # KiB
+    parallelism=int(os.environ.get('ARGON2_PARALLELISM', 2))
+)
+# Hash dummy untuk login dengan username yang tidak ada (lihat verify_dummy_password)
+DUMMY_PASSWORD_HASH = password_hasher.hash('bukan-password-sungguhan')
+
+def verify_dummy_password(password):
+    """Lakukan verifikasi hash palsu agar waktu respons login untuk username yang tidak ada
+    sama dengan password salah (mencegah enumerasi username lewat timing)."""
+    try:
+        password_hasher.verify(DUMMY_PASSWORD_HASH, password)
+    except VerificationError:
+        pass
 
 # --- Model Database SQLAlchemy ---
 
+# NOW() di SQLite (CURRENT_TIMESTAMP) tersimpan sebagai teks 'YYYY-MM-DD HH:MM:SS', sedangkan DateTime bawaan
+# mengirim parameter sebagai '... HH:MM:SS.ffffff'. SQLite membandingkan teks, jadi WHERE timestamp < :ts
+# salah untuk baris di detik yang sama (keyset cursor & ?before=). Format parameter disamakan dengan NOW();
+# MySQL tetap memakai DATETIME biasa.
+DbTimestamp = db.DateTime().with_variant(
+    sqlite.DATETIME(storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d"),
+    'sqlite'
+)
+
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
     password_hash = db.Column(db.String(256), nullable=False) # Simpan hash, bukan password asli
     role = db.Column(db.String(50), nullable=False)
     name = db.Column(db.String(100), nullable=False)
-    transactions = db.relationship('Transaction', backref='user_obj', lazy=True) # Relasi ke Transaction
+    transactions = db.relationship('Transaction', backref=db.backref('user_obj', lazy='select'), lazy='select') # Relasi ke Transaction
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        # Hash lama buatan Werkzeug (pbkdf2/scrypt) tetap bisa diverifikasi
+        if not self.password_hash.startswith('$argon2'):
+            return check_password_hash(self.password_hash, password)
+        try:
+            return password_hasher.verify(self.password_hash, password) # Perbandingan constant-time
+        except (VerificationError, InvalidHashError):
+            return False
+
+    def password_needs_rehash(self):
+        """True jika hash masih Werkzeug atau parameter argon2-nya berbeda dari konfigurasi saat ini."""
+        if not self.password_hash.startswith('$argon2'):
+            return True
+        return password_hasher.check_needs_rehash(self.password_hash)
 
     def __repr__(self):
         return f'<User {self.username}>'
@@ -61,8 +193,11 @@ class InventoryItem(db.Model):
     quantity = db.Column(db.Integer, default=0)
     category = db.Column(db.String(50))
     added_by = db.Column(db.String(80)) # Bisa jadi foreign key ke User.username jika diinginkan
-    last_update = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    transactions = db.relationship('Transaction', backref='item', lazy=True) # Relasi ke Transaction
+    # Diisi jam server DB (NOW() di dalam INSERT/UPDATE), bukan datetime.utcnow() per worker.
+    # default= membuat NOW() ikut dikirim di INSERT, sehingga tabel lama (dibuat sebelum server_default
+    # ada; create_all tidak mengubah kolom yang sudah ada) tetap terisi, bukan NULL
+    last_update = db.Column(DbTimestamp, default=db.func.now(), server_default=db.func.now(), onupdate=db.func.now())
+    transactions = db.relationship('Transaction', backref=db.backref('item', lazy='select'), lazy='select') # Relasi ke Transaction
 
     def __repr__(self):
         return f'<InventoryItem {self.id} - {self.name}>'
@@ -73,52 +208,352 @@ class Transaction(db.Model):
     item_id = db.Column(db.String(50), db.ForeignKey('inventory_item.id'), nullable=False)
     quantity = db.Column(db.Integer, nullable=False)
     user_username = db.Column(db.String(80), db.ForeignKey('user.username'), nullable=False) # Foreign key ke username
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    timestamp = db.Column(DbTimestamp, default=db.func.now(), server_default=db.func.now(), index=True) # Index untuk ORDER BY timestamp DESC LIMIT; default= lihat InventoryItem.last_update
     notes = db.Column(db.Text)
 
+    __table_args__ = (
+        # Untuk filter_by(type=...) + order_by(timestamp) di api_get_transactions
+        db.Index('ix_tx_type_ts', 'type', 'timestamp'),
+        # Untuk cek riwayat per item (hapus item) dan riwayat terbaru per item
+        db.Index('ix_tx_item_ts', 'item_id', 'timestamp'),
+    )
+
     def __repr__(self):
         return f'<Transaction {self.id} - {self.type} - {self.item_id}>'
 
 # --- End Model Database ---
 
 # --- Helper Function ---
-def get_current_timestamp():
-    """Mendapatkan timestamp string format Tahun-Bulan-Tanggal Jam:Menit:Detik (dipertahankan jika masih diperlukan, tapi model Transaction pakai datetime object)"""
-    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+# Serializer tunggal per model agar format JSON tiap endpoint sama; datetime dibiarkan untuk orjson
+def serialize_item(item):
+    return {
+        'id': item.id,
+        'name': item.name,
+        'quantity': item.quantity,
+        'category': item.category,
+        'added_by': item.added_by,
+        'last_update': item.last_update
+    }
+
+def serialize_transaction(t):
+    # Untuk objek Transaction ORM dengan relasi item sudah dimuat (transaction_load_options); key sama dengan
+    # label select_transaction_rows yang dipakai daftar transaksi & respons pencatatan transaksi
+    return {
+        'id': t.id,
+        'type': t.type,
+        'item_id': t.item_id,
+        # Tangani jika item mungkin sudah dihapus (meskipun FK constraint harusnya mencegah)
+        'item_name': t.item.name if t.item else "[Item Dihapus]",
+        'quantity': t.quantity,
+        'user': t.user_username,
+        'timestamp': t.timestamp,
+        'notes': t.notes
+    }
+
+def serialize_user(user):
+    # Tanpa password hash
+    return {
+        'username': user.username,
+        'name': user.name,
+        'role': user.role
+    }
+
+def transaction_load_options():
+    """Opsi loader untuk query Transaction ORM (ber-LIMIT kecil, mis. aktivitas terbaru dashboard):
+    relasi item ikut di-JOIN dalam query yang sama. Daftar transaksi besar memakai Core (select_transaction_rows).
+    Di mode debug, akses relasi lain yang belum dimuat langsung error agar N+1 ketahuan saat pengembangan."""
+    options = [joinedload(Transaction.item, innerjoin=True)]
+    if app.debug:
+        options.append(raiseload('*'))
+    return options
+
+@contextmanager
+def count_queries(conn):
+    """Mencatat statement SQL yang dieksekusi lewat `conn` (Engine/Connection) selama blok with.
+    Contoh: `with count_queries(db.engine) as q: ...; assert len(q) <= 2`"""
+    queries = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        queries.append(statement)
+
+    event.listen(conn, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield queries
+    finally:
+        event.remove(conn, 'before_cursor_execute', before_cursor_execute)
+
+def _is_ok_response(rv):
+    """response_filter untuk @cache.cached: hanya respons 200 yang disimpan, bukan respons error."""
+    return getattr(rv, 'status_code', None) == 200
+
+def invalidate_inventory_cache():
+    """Hapus cache daftar inventaris & ringkasan dashboard (dipanggil setelah data berubah)."""
+    cache.delete_many(INVENTORY_CACHE_KEY, DASHBOARD_CACHE_KEY)
+
+@contextmanager
+def atomic():
+    """Jalankan blok sebagai satu transaksi DB: commit saat blok selesai, rollback lalu lempar ulang
+    exception jika gagal. Menggantikan pasangan commit/rollback manual.
+    Respons error dari dalam blok dikirim lewat `abort(err(...))`, bukan `return`: exception-nya
+    membuat blok di-rollback, sehingga tulisan sebelum titik gagal tidak ikut ter-commit."""
+    try:
+        yield db.session
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+def fast_json(data, status=200):
+    """Buat response JSON dengan orjson (jauh lebih cepat dari json stdlib untuk list besar).
+    datetime diserialisasi langsung sebagai ISO 8601; nilai naive dianggap UTC (+00:00)."""
+    return app.response_class(orjson.dumps(data, option=OrjsonProvider.option), status=status, mimetype='application/json')
+
+STREAM_BATCH_SIZE = 500
+
+def stream_json_array(result):
+    """Kirim hasil query sebagai array JSON secara bertahap (per STREAM_BATCH_SIZE baris).
+    Query harus dieksekusi dengan yield_per agar baris juga diambil dari DB per batch,
+    sehingga memori tetap O(batch) berapapun jumlah barisnya."""
+    def generate():
+        try:
+            yield b'['
+            first = True
+            for partition in result.mappings().partitions():
+                chunk = b','.join(orjson.dumps(dict(row), option=OrjsonProvider.option) for row in partition)
+                yield chunk if first else b',' + chunk
+                first = False
+            yield b']'
+        finally:
+            result.close()
+    return app.response_class(stream_with_context(generate()), mimetype='application/json')
+
+def err(message, status=400):
+    """Response error API standar {"error": message}."""
+    return fast_json({"error": message}, status)
+
+# Body error statis yang sering kena (validasi Content-Type) cukup di-encode sekali
+_NOT_JSON_ERROR_BODY = orjson.dumps({"error": "Request harus dalam format JSON"})
+
+def get_json_body():
+    """Body JSON request jika berupa objek; None jika Content-Type bukan JSON, body rusak, atau bukan objek.
+    silent=True: body rusak tidak melempar exception (BadRequest HTML), cukup satu cek None.
+    Content-Type dicek dengan request.is_json, sama seperti iter_json_array_body."""
+    if not request.is_json:
+        return None
+    data = request.get_json(silent=True)
+    return data if isinstance(data, dict) else None
+
+class _NonEmptyReadStream:
+    """Pembungkus request.stream untuk ijson: LimitedStream Werkzeug menganggap read(0) sebagai
+    klien terputus (400), padahal ijson memanggil read(0) untuk mendeteksi stream bytes/teks."""
+    def __init__(self, stream):
+        self.stream = stream
+
+    def read(self, size=-1):
+        return self.stream.read(size) if size else b''
+
+def iter_json_array_body():
+    """Iterasi elemen array JSON di body request sambil dibaca dari request.stream (ijson),
+    tanpa mem-parse seluruh body menjadi list dulu. None jika Content-Type bukan JSON (seperti
+    get_json_body); melempar ValueError jika body bukan array, ijson.JSONError jika body rusak."""
+    if not request.is_json:
+        return None
+    events = ijson.parse(_NonEmptyReadStream(request.stream), use_float=True)
+    first = next(events, None)
+    if first is None or first[1] != 'start_array':
+        raise ValueError("Body bukan array")
+    return ijson.items(chain([first], events), 'item')
+
+def not_json_error():
+    return app.response_class(_NOT_JSON_ERROR_BODY, status=400, mimetype='application/json')
+
+def get_pagination_args(default_per_page=100, max_per_page=500, per_page_arg='per_page'):
+    """Baca ?page= dan ?per_page= (atau nama lain lewat per_page_arg) dari query string
+    (nilai tidak valid memakai default)."""
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get(per_page_arg, default_per_page, type=int), 1), max_per_page)
+    return page, per_page
+
+def is_paginated_request(*params):
+    """True jika request menyertakan salah satu parameter pagination (tanpa itu, list dikirim penuh seperti sebelumnya)."""
+    return any(p in request.args for p in params)
+
+def encode_transaction_cursor(t):
+    return f"{t.timestamp.isoformat()}_{t.id}"
+
+def decode_transaction_cursor(cursor):
+    """Kebalikan encode_transaction_cursor; ValueError jika format cursor tidak valid."""
+    timestamp_str, _, id_str = cursor.rpartition('_')
+    return datetime.fromisoformat(timestamp_str), int(id_str)
+
+def parse_utc_timestamp(value):
+    """Parse timestamp ISO 8601 dari query string menjadi datetime naive UTC (format kolom DB).
+    Menerima offset zona waktu, mis. nilai `timestamp` dari response API; ValueError jika tidak valid."""
+    timestamp = datetime.fromisoformat(value)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp
+
+def fetch_item_row(item_id):
+    """Baca satu item sebagai Row (Core) dengan kolom yang sama seperti daftar inventaris,
+    tanpa objek ORM / identity map; None jika tidak ada."""
+    return db.session.execute(lambda_stmt(lambda: select(
+        InventoryItem.id, InventoryItem.name, InventoryItem.quantity,
+        InventoryItem.category, InventoryItem.added_by, InventoryItem.last_update
+    ).where(InventoryItem.id == item_id))).one_or_none()
+
+def get_user_by_username(username):
+    """Ambil User lewat unique index username (tanpa LIMIT; paling banyak satu baris)."""
+    return db.session.execute(select(User).where(User.username == username)).scalar_one_or_none()
+
+def _user_version_key(username):
+    return f'user_ver:{username}'
+
+def get_user_version(username):
+    """Versi data user (token acak) yang disimpan di cache tanpa kedaluwarsa.
+    Session menyimpan versi saat login; selama sama, session dianggap masih valid tanpa query DB.
+    Jika key belum ada (cache baru/restart), dibuat token baru sehingga semua session user
+    tersebut divalidasi ulang ke DB sekali.
+    Mengembalikan None jika cache tidak dibagi antar worker (tanpa REDIS_URL): session lalu
+    selalu divalidasi ke DB, karena bump di satu worker tidak terlihat di worker lain."""
+    if not USER_VERSION_CACHE_SHARED:
+        return None
+    key = _user_version_key(username)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, timeout=0) # add: tidak menimpa jika worker lain sudah mengisi
+        version = cache.get(key)
+    return version
+
+def bump_user_version(username):
+    """Ganti versi user (dipanggil saat user ditambah, diubah, atau dihapus) agar session lama divalidasi ulang."""
+    if USER_VERSION_CACHE_SHARED:
+        cache.set(_user_version_key(username), uuid.uuid4().hex, timeout=0)
+
+TRANSACTION_TYPE_LABELS = {'masuk': 'Masuk', 'keluar': 'Keluar'}
+
+def parse_transaction_input(data, label):
+    """Validasi payload transaksi masuk/keluar ({'item_id', 'quantity', 'notes'}).
+    Mengembalikan (item_id, quantity, notes, error); error berisi pesan untuk respons 400 atau None."""
+    item_id = data.get('item_id')
+    quantity = data.get('quantity') # Bisa int (klien API) atau string (form frontend)
+    notes = data.get('notes', '')
+
+    if not item_id or not quantity:
+        return item_id, None, notes, f"ID Item dan Jumlah {label} harus diisi"
+    # Tipe dicek sebelum dipakai sebagai key dict/set atau parameter SQL (list/objek JSON -> 400, bukan 500)
+    if not isinstance(item_id, str):
+        return None, None, notes, "ID Item harus berupa teks"
+    if notes is not None and not isinstance(notes, str):
+        return item_id, None, None, "Catatan harus berupa teks"
+    if type(quantity) is not int: # int (bukan bool) langsung dipakai tanpa konversi
+        # bool dan float pecahan ditolak, bukan dibulatkan int() menjadi jumlah stok yang berbeda
+        if isinstance(quantity, bool) or (isinstance(quantity, float) and not quantity.is_integer()):
+            return item_id, None, notes, f"Jumlah {label} harus berupa angka bulat positif"
+        try:
+            quantity = int(quantity)
+        except (ValueError, TypeError):
+            return item_id, None, notes, f"Jumlah {label} harus berupa angka bulat positif"
+    if quantity <= 0:
+        return item_id, None, notes, f"Jumlah {label} harus lebih dari 0"
+    return item_id, quantity, notes, None
+
+# --- Hitung Query per Request (hanya mode debug) ---
+# Jumlah statement SQL dikirim di header X-Query-Count agar regresi N+1 mudah terlihat.
+# Listener dipasang di engine, jadi pada server dev multi-thread angka bisa tercampur antar request.
+@app.before_request
+def _begin_query_count():
+    if app.debug:
+        g.query_count_stack = ExitStack()
+        g.queries = g.query_count_stack.enter_context(count_queries(db.engine))
+
+@app.after_request
+def _add_query_count_header(response):
+    if 'queries' in g:
+        response.headers['X-Query-Count'] = str(len(g.queries))
+    return response
+
+@app.teardown_request
+def _end_query_count(exc):
+    stack = g.pop('query_count_stack', None)
+    if stack is not None:
+        stack.close()
 
 # --- Decorators untuk Otentikasi & Otorisasi ---
-def login_required(f):
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        if 'user' not in session:
-            flash('Akses ditolak. Silakan login terlebih dahulu.', 'warning')
-            return redirect(url_for('login'))
-        # Periksa juga apakah user di session masih ada di DB (opsional tapi lebih aman)
-        user_in_db = User.query.filter_by(username=session['user']['username']).first()
-        if not user_in_db:
+def authenticate_session():
+    """Validasi user di session dan isi g.current_user.
+    Mengembalikan response redirect jika belum login / sesi tidak valid, atau None jika lolos."""
+    session_user = session.get('user')
+    if session_user is None:
+        flash('Akses ditolak. Silakan login terlebih dahulu.', 'warning')
+        return redirect(url_for('login'))
+    # Periksa juga apakah user di session masih ada di DB (opsional tapi lebih aman).
+    # Dengan cache bersama (Redis), DB hanya dicek jika versi user di cache berbeda dari versi di
+    # session (user diubah/dihapus sejak login); selain itu cukup satu GET ke cache tanpa query User.
+    # Tanpa cache bersama versi selalu None dan DB dicek setiap request.
+    username = session_user['username']
+    current_version = get_user_version(username)
+    if current_version is None or session_user.get('version') != current_version:
+        user_in_db = get_user_by_username(username)
+        # Username yang dihapus lalu dibuat ulang adalah akun lain: session lama tidak boleh mewarisinya
+        session_user_id = session_user.get('id')
+        if not user_in_db or (session_user_id is not None and session_user_id != user_in_db.id):
             session.pop('user', None)
             flash('Sesi tidak valid, silakan login kembali.', 'warning')
             return redirect(url_for('login'))
+        # Sinkronkan role & nama di session dengan DB (misal role baru saja diubah admin)
+        synced_user = {
+            'id': user_in_db.id,
+            'username': user_in_db.username,
+            'role': user_in_db.role,
+            'name': user_in_db.name,
+            'version': current_version
+        }
+        # Session hanya ditulis ulang jika isinya berubah (hindari Set-Cookie di setiap request)
+        if synced_user != session_user:
+            session['user'] = synced_user
+        session_user = synced_user
+    # Simpan user yang sudah divalidasi agar route tidak membaca session lagi
+    g.current_user = session_user
+    return None
+
+def login_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        denied = authenticate_session()
+        if denied is not None:
+            return denied
         return f(*args, **kwargs)
     return decorated_function
 
 def role_required(allowed_roles):
-    """Decorator untuk membatasi akses berdasarkan role."""
+    """Decorator untuk membatasi akses berdasarkan role.
+    Sudah mencakup pengecekan login (authenticate_session), jadi tidak perlu ditumpuk dengan
+    @login_required: satu lapis wrapper per request di route yang paling sering dipanggil."""
+    allowed = frozenset(allowed_roles) # Dibuat sekali saat dekorasi, bukan per request
     def role_decorator(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
-            if 'user' not in session:
-                flash('Akses ditolak. Silakan login terlebih dahulu.', 'warning')
-                return redirect(url_for('login'))
+            denied = authenticate_session()
+            if denied is not None:
+                return denied
 
-            user_role = session['user'].get('role')
-            if user_role not in allowed_roles:
+            user_role = g.current_user.get('role')
+            if user_role not in allowed:
                 flash(f'Akses ditolak. Role "{user_role}" tidak diizinkan mengakses halaman ini.', 'danger')
                 return redirect(url_for('unauthorized'))
             return f(*args, **kwargs)
         return decorated_function
     return role_decorator
 
+@app.errorhandler(SQLAlchemyError)
+def handle_database_error(e):
+    """Respons JSON 500 terpusat untuk error database yang tidak ditangani route (mis. endpoint transaksi).
+    atomic() sudah rollback sebelum exception sampai sini; rollback ulang untuk error di luar blok atomic."""
+    db.session.rollback()
+    app.logger.exception("Database error on %s %s", request.method, request.path)
+    return err("Gagal memproses data di database", 500)
+
 # --- Routes untuk Halaman Web (View Rendering) ---
 
 @app.route('/')
@@ -143,14 +578,33 @@ def login():
             return render_template('login.html')
 
         # Cari user di database
-        user = User.query.filter_by(username=username).first()
+        user = get_user_by_username(username)
 
-        if user and user.check_password(password):
+        # Selalu jalankan satu verifikasi hash, baik user ada maupun tidak, agar waktu respons
+        # tidak membocorkan username mana yang terdaftar. Perbandingan digest di argon2 maupun
+        # werkzeug (hash lama) sudah constant-time (hmac.compare_digest)
+        if user:
+            ok = user.check_password(password)
+        else:
+            verify_dummy_password(password)
+            ok = False
+
+        if ok:
+            # Password benar: upgrade hash lama ke parameter argon2 saat ini (hanya sekali per user)
+            if user.password_needs_rehash():
+                try:
+                    user.set_password(password)
+                    db.session.commit()
+                except Exception as e:
+                    db.session.rollback()
+                    app.logger.error(f"Error rehashing password for {user.username}: {e}")
             # Simpan informasi user ke session
             session['user'] = {
+                'id': user.id,
                 'username': user.username,
                 'role': user.role,
-                'name': user.name
+                'name': user.name,
+                'version': get_user_version(user.username)
             }
             flash(f"Login berhasil! Selamat datang, {user.name}.", 'success')
             return redirect(url_for('dashboard_view'))
@@ -172,7 +626,7 @@ def register():
 
         if not all([username, password, name]):
             flash('Semua field (username, password, nama) harus diisi.', 'warning')
-        elif User.query.filter_by(username=username).first():
+        elif db.session.scalar(select(User.id).where(User.username == username)) is not None:
             flash(f'Username "{username}" sudah digunakan.', 'warning')
         else:
             try:
@@ -182,6 +636,7 @@ def register():
 
                 db.session.add(new_user)
                 db.session.commit()
+                bump_user_version(username)
 
                 flash(f'Registrasi berhasil untuk {username}! Anda terdaftar sebagai {role}. Silakan login.', 'success')
                 return redirect(url_for('login'))
@@ -197,7 +652,7 @@ def register():
 @login_required
 def logout():
     """Logout user"""
-    user_name = session.get('user', {}).get('name', 'User')
+    user_name = g.current_user.get('name', 'User')
     session.pop('user', None)
     flash(f'Anda ({user_name}) telah berhasil logout.', 'info')
     return redirect(url_for('login'))
@@ -215,122 +670,122 @@ def unauthorized():
 @app.route('/dashboard')
 @login_required
 def dashboard_view():
-    user_role = session.get('user', {}).get('role')
-    return render_template('dashboard.html', user_role=user_role)
+    return render_template('dashboard.html')
 
 @app.route('/inventory')
-@login_required
 @role_required(['admin', 'manajer', 'operator'])
 def inventory_view():
-    user_role = session.get('user', {}).get('role')
-    return render_template('inventory.html', user_role=user_role)
+    return render_template('inventory.html')
 
 @app.route('/input-barang')
-@login_required
 @role_required(['admin', 'operator'])
 def barang_masuk_view():
-    user_role = session.get('user', {}).get('role')
-    return render_template('barang_masuk.html', user_role=user_role)
+    return render_template('barang_masuk.html')
 
 @app.route('/barang-keluar')
-@login_required
 @role_required(['admin', 'operator'])
 def barang_keluar_view():
-    user_role = session.get('user', {}).get('role')
-    return render_template('barang_keluar.html', user_role=user_role)
+    return render_template('barang_keluar.html')
 
 @app.route('/manage-users')
-@login_required
 @role_required(['admin'])
 def manage_users_view():
-    user_role = session.get('user', {}).get('role')
     # Data user akan diambil via API, jadi tidak perlu dikirim dari sini
-    return render_template('manajemen_akun.html', user_role=user_role)
+    return render_template('manajemen_akun.html')
 
 
 # --- API Routes (Logika Bisnis & Interaksi Database) ---
 # TODO: Ganti semua logika API untuk menggunakan SQLAlchemy
 
 @app.route('/api/dashboard/summary', methods=['GET'])
-@login_required
 @role_required(['admin', 'manajer']) # Hanya admin & manajer boleh lihat summary
+@cache.cached(timeout=30, key_prefix=DASHBOARD_CACHE_KEY, response_filter=_is_ok_response)
 def api_dashboard_summary():
     """API Endpoint untuk mendapatkan data summary dashboard."""
     try:
-        # Hitung jumlah item unik
-        total_unique_items = InventoryItem.query.count()
-
-        # Hitung total kuantitas stok
-        total_stock_quantity = db.session.query(db.func.sum(InventoryItem.quantity)).scalar() or 0
-
-        # Hitung total transaksi
-        total_transactions = Transaction.query.count()
-
-        # Ambil 5 transaksi terbaru (Kembalikan order by timestamp)
-        recent_transactions = Transaction.query.order_by(Transaction.timestamp.desc()).limit(5).all()
+        # Agregat inventaris (item unik, total stok, stok menipis) dan transaksi (total, masuk, keluar)
+        # dihitung dalam satu round-trip: dua subquery satu baris yang di-cross join
+        inventory_stats = select(
+            db.func.count(InventoryItem.id).label('total_unique_items'),
+            db.func.coalesce(db.func.sum(InventoryItem.quantity), 0).label('total_stock_quantity'),
+            db.func.coalesce(db.func.sum(case((InventoryItem.quantity < LOW_STOCK_THRESHOLD, 1), else_=0)), 0).label('low_stock_items')
+        ).subquery()
+        transaction_stats = select(
+            db.func.count(Transaction.id).label('total_transactions'),
+            db.func.coalesce(db.func.sum(case((Transaction.type == 'masuk', 1), else_=0)), 0).label('total_incoming'),
+            db.func.coalesce(db.func.sum(case((Transaction.type == 'keluar', 1), else_=0)), 0).label('total_outgoing')
+        ).subquery()
+        stats = db.session.execute(
+            select(inventory_stats, transaction_stats)
+            .select_from(inventory_stats.join(transaction_stats, true()))
+        ).one()
+
+        # Ambil 5 transaksi terbaru (Kembalikan order by timestamp), item di-JOIN dalam query yang sama (hindari N+1)
+        recent_transactions = Transaction.query.options(*transaction_load_options()).order_by(Transaction.timestamp.desc()).limit(5).all()
         # recent_transactions = Transaction.query.order_by(Transaction.id.desc()).limit(5).all() # Order by ID for DEBUGGING
 
         # Format data transaksi terkini
-        recent_activity_list = []
-        for t in recent_transactions:
-            # Coba dapatkan nama item, tangani jika item mungkin sudah dihapus (meskipun FK constraint harusnya mencegah)
-            item_name = t.item.name if t.item else "[Item Dihapus]"
-            recent_activity_list.append({
-                'id': t.id,
-                'type': t.type,
-                'item_id': t.item_id,
-                'item_name': item_name,
-                'quantity': t.quantity,
-                'user': t.user_username,
-                'timestamp': t.timestamp.strftime('%Y-%m-%d %H:%M:%S'),
-                'notes': t.notes
-            })
+        recent_activity_list = [serialize_transaction(t) for t in recent_transactions]
 
         summary_data = {
-            'total_unique_items': total_unique_items,
-            'total_stock_quantity': total_stock_quantity,
-            'total_transactions': total_transactions,
-            # 'low_stock_items': 0, # TODO: Implementasi jika diperlukan
+            'total_unique_items': stats.total_unique_items,
+            'total_stock_quantity': int(stats.total_stock_quantity), # SUM di MySQL mengembalikan DECIMAL
+            'total_transactions': stats.total_transactions,
+            'total_incoming': int(stats.total_incoming),
+            'total_outgoing': int(stats.total_outgoing),
+            'low_stock_items': int(stats.low_stock_items),
             'recent_activity': recent_activity_list
         }
-        return jsonify(summary_data)
+        return fast_json(summary_data)
 
     except Exception as e:
         app.logger.error(f"Error fetching dashboard summary: {e}")
-        return jsonify({"error": "Gagal mengambil ringkasan dashboard"}), 500
+        return err("Gagal mengambil ringkasan dashboard", 500)
 
 
 @app.route('/api/inventory', methods=['GET'])
-@login_required
 @role_required(['admin', 'manajer', 'operator'])
+@cache.cached(timeout=30, key_prefix=INVENTORY_CACHE_KEY, response_filter=_is_ok_response,
+              unless=lambda: is_paginated_request('page', 'per_page'))
 def api_get_inventory():
-    # TODO: Implementasi dengan query SQLAlchemy
+    """API Endpoint daftar inventaris. Dengan ?page=&per_page= hasil dipaginasi
+    dan dibungkus {'items': [...], 'next_page': ...}; tanpa itu dikirim seluruhnya (dan di-cache)."""
     try:
-        items = InventoryItem.query.all()
-        inventory_list = [
-            {
-                'id': item.id,
-                'name': item.name,
-                'quantity': item.quantity,
-                'category': item.category,
-                'added_by': item.added_by,
-                'last_update': item.last_update.strftime('%Y-%m-%d %H:%M:%S') if item.last_update else None
-            } for item in items
-        ]
-        return jsonify(inventory_list)
+        # Select kolom langsung (Core), tanpa membangun objek ORM yang langsung dibuang saat serialisasi.
+        # lambda_stmt: konstruksi & kompilasi statement di-cache, request berikutnya tinggal bind parameter.
+        stmt = lambda_stmt(lambda: select(
+            InventoryItem.id, InventoryItem.name, InventoryItem.quantity,
+            InventoryItem.category, InventoryItem.added_by, InventoryItem.last_update
+        ))
+        paginated = is_paginated_request('page', 'per_page')
+        if paginated:
+            page, per_page = get_pagination_args()
+            limit, offset = per_page + 1, (page - 1) * per_page
+            # Ambil satu baris lebih untuk tahu apakah masih ada halaman berikutnya
+            stmt += lambda s: s.order_by(InventoryItem.id).limit(limit).offset(offset)
+        rows = db.session.execute(stmt).mappings().all()
+        inventory_list = [dict(row) for row in rows]
+        if paginated:
+            has_more = len(inventory_list) > per_page
+            return fast_json({
+                'items': inventory_list[:per_page],
+                'page': page,
+                'per_page': per_page,
+                'next_page': page + 1 if has_more else None
+            })
+        return fast_json(inventory_list)
     except Exception as e:
         app.logger.error(f"Error fetching inventory: {e}")
-        return jsonify({"error": "Gagal mengambil data inventaris"}), 500
+        return err("Gagal mengambil data inventaris", 500)
 
 @app.route('/api/inventory', methods=['POST'])
-@login_required
 @role_required(['admin', 'operator'])
 def api_add_inventory_item():
     """API Endpoint untuk menambahkan item inventaris baru."""
-    if not request.is_json:
-        return jsonify({"error": "Request harus dalam format JSON"}), 400
+    data = get_json_body()
+    if data is None:
+        return not_json_error()
 
-    data = request.get_json()
     item_id = data.get('item_id')
     name = data.get('name')
     category = data.get('category')
@@ -338,29 +793,23 @@ def api_add_inventory_item():
 
     # Validasi input dasar
     if not all([item_id, name, category, quantity_str]):
-        return jsonify({"error": "ID Item, Nama, Kategori, dan Jumlah Awal harus diisi"}), 400
+        return err("ID Item, Nama, Kategori, dan Jumlah Awal harus diisi", 400)
 
     # Validasi ID Item (misal: tidak boleh kosong setelah strip)
     item_id = item_id.strip().upper()
     if not item_id:
-         return jsonify({"error": "ID Item tidak boleh kosong"}), 400
+         return err("ID Item tidak boleh kosong", 400)
 
     # Validasi jumlah
     try:
         quantity = int(quantity_str)
         if quantity < 0:
-            return jsonify({"error": "Jumlah Awal tidak boleh negatif"}), 400
+            return err("Jumlah Awal tidak boleh negatif", 400)
     except (ValueError, TypeError):
-        return jsonify({"error": "Jumlah Awal harus berupa angka bulat non-negatif"}), 400
-
-    # Cek apakah ID sudah ada
-    if InventoryItem.query.get(item_id):
-        return jsonify({"error": f"Item dengan ID {item_id} sudah ada"}), 409 # Conflict
+        return err("Jumlah Awal harus berupa angka bulat non-negatif", 400)
 
     try:
-        current_user = session.get('user', {}).get('username')
-        if not current_user:
-            return jsonify({"error": "Sesi pengguna tidak valid"}), 401
+        current_user = g.current_user['username']
 
         # Buat item baru
         new_item = InventoryItem(
@@ -372,79 +821,60 @@ def api_add_inventory_item():
             # last_update akan diatur otomatis oleh default/onupdate
         )
 
+        # Tanpa SELECT cek duplikat dulu: primary key yang menolak ID ganda (satu round-trip, bebas race)
         db.session.add(new_item)
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            return err(f"Item dengan ID {item_id} sudah ada", 409) # Conflict
+        invalidate_inventory_cache()
 
         # Return data item yang baru dibuat
-        item_data = {
-            'id': new_item.id,
-            'name': new_item.name,
-            'quantity': new_item.quantity,
-            'category': new_item.category,
-            'added_by': new_item.added_by,
-            'last_update': new_item.last_update.strftime('%Y-%m-%d %H:%M:%S') if new_item.last_update else None
-        }
-        return jsonify(item_data), 201 # Created
+        return fast_json(serialize_item(new_item), 201) # Created
 
     except Exception as e:
         db.session.rollback()
         app.logger.error(f"Error adding inventory item {item_id}: {e}")
-        return jsonify({"error": "Gagal menambahkan item ke database"}), 500
+        return err("Gagal menambahkan item ke database", 500)
 
 @app.route('/api/inventory/<item_id>', methods=['GET'])
-@login_required
 @role_required(['admin', 'manajer', 'operator']) # Semua boleh lihat detail
 def api_get_inventory_item(item_id):
     """API Endpoint untuk mendapatkan detail item inventaris."""
     try:
-        item = InventoryItem.query.get(item_id)
-        if not item:
-            return jsonify({"error": f"Item dengan ID {item_id} tidak ditemukan"}), 404
-
-        item_data = {
-            'id': item.id,
-            'name': item.name,
-            'quantity': item.quantity,
-            'category': item.category,
-            'added_by': item.added_by,
-            'last_update': item.last_update.strftime('%Y-%m-%d %H:%M:%S') if item.last_update else None
-        }
-        return jsonify(item_data)
+        item = fetch_item_row(item_id)
+        if item is None:
+            return err(f"Item dengan ID {item_id} tidak ditemukan", 404)
+
+        return fast_json(serialize_item(item))
     except Exception as e:
         app.logger.error(f"Error fetching item {item_id}: {e}")
-        return jsonify({"error": "Gagal mengambil detail item"}), 500
+        return err("Gagal mengambil detail item", 500)
 
 @app.route('/api/inventory/<item_id>', methods=['PUT'])
-@login_required
 @role_required(['admin']) # Hanya admin boleh update
 def api_update_inventory_item(item_id):
     """API Endpoint untuk mengupdate item inventaris (hanya Admin)."""
-    if not request.is_json:
-        return jsonify({"error": "Request harus dalam format JSON"}), 400
-
-    item = InventoryItem.query.get(item_id)
-    if not item:
-        return jsonify({"error": f"Item dengan ID {item_id} tidak ditemukan"}), 404
+    data = get_json_body()
+    if data is None:
+        return not_json_error()
 
-    data = request.get_json()
+    values = {} # Kolom yang dikirim client; dicek & di-UPDATE langsung tanpa SELECT item dulu
     updated = False
 
     try:
         if 'name' in data:
             name = data['name'].strip()
             if not name:
-                return jsonify({"error": "Nama item tidak boleh kosong"}), 400
-            if item.name != name:
-                item.name = name
-                updated = True
+                return err("Nama item tidak boleh kosong", 400)
+            values['name'] = name
 
         if 'category' in data:
             category = data['category'].strip()
             if not category:
-                 return jsonify({"error": "Kategori tidak boleh kosong"}), 400
-            if item.category != category:
-                item.category = category
-                updated = True
+                 return err("Kategori tidak boleh kosong", 400)
+            values['category'] = category
 
         # Note: Mengubah quantity sebaiknya melalui transaksi masuk/keluar
         # Jika ingin mengizinkan penyesuaian langsung (misal stock opname):
@@ -452,94 +882,96 @@ def api_update_inventory_item(item_id):
              try:
                  quantity = int(data['quantity'])
                  if quantity < 0:
-                     return jsonify({"error": "Jumlah tidak boleh negatif"}), 400
-                 if item.quantity != quantity:
-                     item.quantity = quantity
-                     updated = True # Anggap perlu update timestamp jika quantity berubah
+                     return err("Jumlah tidak boleh negatif", 400)
+                 values['quantity'] = quantity
              except (ValueError, TypeError):
-                 return jsonify({"error": "Jumlah harus berupa angka bulat"}), 400
+                 return err("Jumlah harus berupa angka bulat", 400)
+
+        if values:
+            # Satu UPDATE; baris hanya cocok jika ada nilai yang benar-benar berbeda, jadi
+            # last_update (onupdate=db.func.now()) tidak bergeser untuk request tanpa perubahan
+            result = db.session.execute(
+                update(InventoryItem)
+                .where(
+                    InventoryItem.id == item_id,
+                    or_(*(getattr(InventoryItem, column).is_distinct_from(value) for column, value in values.items()))
+                )
+                .values(**values)
+                .execution_options(synchronize_session=False)
+            )
+            updated = result.rowcount > 0
+
+        # Baca hasil akhir (termasuk last_update dari DB); sekaligus membedakan item tidak ada
+        item = fetch_item_row(item_id)
+        if item is None:
+            return err(f"Item dengan ID {item_id} tidak ditemukan", 404)
 
         if updated:
-            # Timestamp last_update akan otomatis diupdate oleh onupdate=datetime.utcnow
             db.session.commit()
+            invalidate_inventory_cache()
 
         # Return item yang sudah diupdate
-        item_data = {
-            'id': item.id,
-            'name': item.name,
-            'quantity': item.quantity,
-            'category': item.category,
-            'added_by': item.added_by,
-            'last_update': item.last_update.strftime('%Y-%m-%d %H:%M:%S') if item.last_update else None
-        }
-        return jsonify(item_data)
+        return fast_json(serialize_item(item))
 
     except Exception as e:
         db.session.rollback()
         app.logger.error(f"Error updating item {item_id}: {e}")
-        return jsonify({"error": "Gagal mengupdate item"}), 500
+        return err("Gagal mengupdate item", 500)
 
 @app.route('/api/inventory/<item_id>', methods=['DELETE'])
-@login_required
 @role_required(['admin']) # Hanya admin boleh delete
 def api_delete_inventory_item(item_id):
     """API Endpoint untuk menghapus item inventaris (hanya Admin)."""
-    item = InventoryItem.query.get(item_id)
+    item = db.session.get(InventoryItem, item_id)
     if not item:
-        return jsonify({"error": f"Item dengan ID {item_id} tidak ditemukan"}), 404
+        return err(f"Item dengan ID {item_id} tidak ditemukan", 404)
 
     try:
-        # Cek apakah ada transaksi terkait item ini
-        transaction_count = Transaction.query.filter_by(item_id=item_id).count()
-        if transaction_count > 0:
-            return jsonify({"error": f"Tidak dapat menghapus item '{item.name}' karena memiliki {transaction_count} riwayat transaksi."}), 400
+        # Cek apakah ada transaksi terkait item ini: EXISTS berhenti di baris pertama (index ix_tx_item_ts),
+        # jumlah pastinya hanya dihitung untuk pesan error
+        if db.session.scalar(select(exists().where(Transaction.item_id == item_id))):
+            transaction_count = db.session.scalar(select(db.func.count(Transaction.id)).where(Transaction.item_id == item_id))
+            return err(f"Tidak dapat menghapus item '{item.name}' karena memiliki {transaction_count} riwayat transaksi.", 400)
 
         # Opsional: Cek apakah stok masih ada (mungkin tidak perlu jika cek transaksi sudah cukup)
         # if item.quantity > 0:
-        #     return jsonify({"error": f"Tidak dapat menghapus item '{item.name}' karena stok masih ada ({item.quantity})."}), 400
+        #     return err(f"Tidak dapat menghapus item '{item.name}' karena stok masih ada ({item.quantity}).", 400)
 
         # Hapus item
         item_name = item.name # Simpan nama untuk pesan respons
         db.session.delete(item)
         db.session.commit()
+        invalidate_inventory_cache()
 
-        return jsonify({"message": f"Item '{item_name}' (ID: {item_id}) berhasil dihapus"})
+        return fast_json({"message": f"Item '{item_name}' (ID: {item_id}) berhasil dihapus"})
 
     except Exception as e:
         db.session.rollback()
         app.logger.error(f"Error deleting item {item_id}: {e}")
-        return jsonify({"error": "Gagal menghapus item"}), 500
+        return err("Gagal menghapus item", 500)
 
 # --- API Users ---
 @app.route('/api/users', methods=['GET'])
-@login_required
 @role_required(['admin'])
 def api_get_users():
     """API Endpoint untuk mendapatkan daftar pengguna (hanya Admin)."""
     try:
-        users = User.query.all()
-        users_list = [
-            {
-                'username': user.username,
-                'name': user.name,
-                'role': user.role
-                # Jangan sertakan password_hash!
-            } for user in users
-        ]
-        return jsonify(users_list)
+        # Hanya kolom yang dikirim ke client (jangan sertakan password_hash!)
+        rows = db.session.execute(select(User.username, User.name, User.role)).mappings().all()
+        users_list = [dict(row) for row in rows]
+        return fast_json(users_list)
     except Exception as e:
         app.logger.error(f"Error fetching users: {e}")
-        return jsonify({"error": "Gagal mengambil data pengguna"}), 500
+        return err("Gagal mengambil data pengguna", 500)
 
 @app.route('/api/users', methods=['POST'])
-@login_required
 @role_required(['admin'])
 def api_add_user():
     """API Endpoint untuk menambah pengguna baru (hanya Admin)."""
-    if not request.is_json:
-        return jsonify({"error": "Request harus dalam format JSON"}), 400
+    data = get_json_body()
+    if data is None:
+        return not_json_error()
 
-    data = request.get_json()
     username = data.get('username')
     password = data.get('password')
     name = data.get('name')
@@ -547,58 +979,54 @@ def api_add_user():
 
     # Validasi input dasar
     if not all([username, password, name, role]):
-        return jsonify({"error": "Semua field (username, password, nama, role) harus diisi"}), 400
+        return err("Semua field (username, password, nama, role) harus diisi", 400)
 
     # Validasi role
     allowed_roles = ['admin', 'manajer', 'operator']
     if role not in allowed_roles:
-        return jsonify({"error": f"Role tidak valid. Pilih salah satu dari: {', '.join(allowed_roles)}"}), 400
-
-    # Cek apakah username sudah ada
-    if User.query.filter_by(username=username).first():
-        return jsonify({"error": f"Username '{username}' sudah digunakan"}), 409 # 409 Conflict
+        return err(f"Role tidak valid. Pilih salah satu dari: {', '.join(allowed_roles)}", 400)
 
     try:
         # Buat user baru
         new_user = User(username=username, name=name, role=role)
         new_user.set_password(password) # Hash password
 
+        # Username ganda ditolak oleh unique constraint, tanpa SELECT cek terpisah
         db.session.add(new_user)
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            return err(f"Username '{username}' sudah digunakan", 409) # 409 Conflict
+        bump_user_version(username)
 
         # Return data user baru (tanpa password hash)
-        user_data = {
-            'username': new_user.username,
-            'name': new_user.name,
-            'role': new_user.role
-        }
-        return jsonify(user_data), 201 # 201 Created
+        return fast_json(serialize_user(new_user), 201) # 201 Created
 
     except Exception as e:
         db.session.rollback()
         app.logger.error(f"Error adding user {username}: {e}")
-        return jsonify({"error": "Gagal menambahkan pengguna ke database"}), 500
+        return err("Gagal menambahkan pengguna ke database", 500)
 
 @app.route('/api/users/<username>', methods=['PUT'])
-@login_required
 @role_required(['admin'])
 def api_update_user(username):
     """API Endpoint untuk mengupdate data pengguna (hanya Admin)."""
-    if not request.is_json:
-        return jsonify({"error": "Request harus dalam format JSON"}), 400
+    data = get_json_body()
+    if data is None:
+        return not_json_error()
 
-    user = User.query.filter_by(username=username).first()
+    user = get_user_by_username(username)
     if not user:
-        return jsonify({"error": f"Pengguna '{username}' tidak ditemukan"}), 404
+        return err(f"Pengguna '{username}' tidak ditemukan", 404)
 
-    data = request.get_json()
     updated = False
 
     try:
         if 'name' in data:
             name = data['name'].strip()
             if not name:
-                return jsonify({"error": "Nama tidak boleh kosong"}), 400
+                return err("Nama tidak boleh kosong", 400)
             if user.name != name:
                 user.name = name
                 updated = True
@@ -607,10 +1035,10 @@ def api_update_user(username):
             role = data['role']
             allowed_roles = ['admin', 'manajer', 'operator']
             if role not in allowed_roles:
-                return jsonify({"error": f"Role tidak valid. Pilih salah satu dari: {', '.join(allowed_roles)}"}), 400
+                return err(f"Role tidak valid. Pilih salah satu dari: {', '.join(allowed_roles)}", 400)
             # Cegah admin mengubah role dirinya sendiri (jika diinginkan, bisa dihapus)
-            if username == session.get('user', {}).get('username') and user.role == 'admin' and role != 'admin':
-                 return jsonify({"error": "Admin tidak dapat mengubah role dirinya sendiri."}), 400
+            if username == g.current_user['username'] and user.role == 'admin' and role != 'admin':
+                 return err("Admin tidak dapat mengubah role dirinya sendiri.", 400)
             if user.role != role:
                 user.role = role
                 updated = True
@@ -622,230 +1050,290 @@ def api_update_user(username):
 
         if updated:
             db.session.commit()
+            bump_user_version(username)
 
         # Return data user yang diupdate (tanpa password hash)
-        user_data = {
-            'username': user.username,
-            'name': user.name,
-            'role': user.role
-        }
-        return jsonify(user_data)
+        return fast_json(serialize_user(user))
 
     except Exception as e:
         db.session.rollback()
         app.logger.error(f"Error updating user {username}: {e}")
-        return jsonify({"error": "Gagal mengupdate pengguna"}), 500
+        return err("Gagal mengupdate pengguna", 500)
 
 @app.route('/api/users/<username>', methods=['DELETE'])
-@login_required
 @role_required(['admin'])
 def api_delete_user(username):
     """API Endpoint untuk menghapus pengguna (hanya Admin)."""
-    user = User.query.filter_by(username=username).first()
+    user = get_user_by_username(username)
     if not user:
-        return jsonify({"error": f"Pengguna '{username}' tidak ditemukan"}), 404
+        return err(f"Pengguna '{username}' tidak ditemukan", 404)
 
     # Cek apakah user mencoba menghapus dirinya sendiri
-    if username == session.get('user', {}).get('username'):
-        return jsonify({"error": "Tidak dapat menghapus akun Anda sendiri."}), 400
+    if username == g.current_user['username']:
+        return err("Tidak dapat menghapus akun Anda sendiri.", 400)
 
     try:
         # Cek apakah user punya transaksi (opsional, tergantung aturan bisnis)
         # transaction_count = Transaction.query.filter_by(user_username=username).count()
         # if transaction_count > 0:
-        #     return jsonify({"error": f"Tidak dapat menghapus pengguna '{username}' karena memiliki riwayat transaksi."}), 400
+        #     return err(f"Tidak dapat menghapus pengguna '{username}' karena memiliki riwayat transaksi.", 400)
 
         db.session.delete(user)
         db.session.commit()
-        return jsonify({"message": f"Pengguna '{username}' berhasil dihapus"})
+        bump_user_version(username)
+        return fast_json({"message": f"Pengguna '{username}' berhasil dihapus"})
 
     except Exception as e:
         db.session.rollback()
         app.logger.error(f"Error deleting user {username}: {e}")
         # Tangani error jika ada foreign key constraint (misal dari transaksi)
         if "foreign key constraint" in str(e).lower():
-             return jsonify({"error": f"Tidak dapat menghapus pengguna '{username}' karena terkait dengan data lain (misal: transaksi)."}), 400
-        return jsonify({"error": "Gagal menghapus pengguna"}), 500
+             return err(f"Tidak dapat menghapus pengguna '{username}' karena terkait dengan data lain (misal: transaksi).", 400)
+        return err("Gagal menghapus pengguna", 500)
 
 # --- API Transactions ---
 @app.route('/api/transactions', methods=['GET'])
-@login_required
 # Akses role bisa disesuaikan, mungkin semua perlu lihat transaksi?
 @role_required(['admin', 'manajer', 'operator'])
 def api_get_transactions():
-    """API Endpoint untuk mendapatkan daftar transaksi, bisa difilter by type."""
+    """API Endpoint untuk mendapatkan daftar transaksi, bisa difilter by type.
+    Dengan ?per_page=&cursor= (atau ?limit=&before=) hasil dipaginasi secara keyset (timestamp, id) dan dibungkus
+    {'items': [...], 'next_cursor': ...}; tanpa itu seluruh riwayat dikirim seperti sebelumnya."""
     try:
-        query = Transaction.query
+        # Select kolom langsung (Core) dengan JOIN ke item untuk nama item: satu query,
+        # tanpa objek ORM dan tanpa lazy load per transaksi
+        # (lambda_stmt: statement di-cache, tiap variasi filter cukup dikompilasi sekali)
+        query = lambda_stmt(lambda: select_transaction_rows())
 
         # Filter berdasarkan tipe jika ada di query args
         transaction_type = request.args.get('type')
         if transaction_type in ['masuk', 'keluar']:
-            query = query.filter_by(type=transaction_type)
-
-        # Urutkan berdasarkan timestamp terbaru
-        transactions = query.order_by(Transaction.timestamp.desc()).all()
-
-        transactions_list = []
-        for t in transactions:
-            transactions_list.append({
-                'id': t.id,
-                'type': t.type,
-                'item_id': t.item_id,
-                'item_name': t.item.name, # Ambil nama item dari relasi
-                'quantity': t.quantity,
-                'user': t.user_username,
-                'timestamp': t.timestamp.strftime('%Y-%m-%d %H:%M:%S'),
-                'notes': t.notes
-            })
-
-        return jsonify(transactions_list)
+            query += lambda s: s.where(Transaction.type == transaction_type)
+
+        # ?limit= alias untuk ?per_page=, ?before=<timestamp ISO> untuk mulai dari waktu tertentu
+        paginated = is_paginated_request('per_page', 'cursor', 'limit', 'before')
+        if paginated:
+            _, per_page = get_pagination_args(per_page_arg='limit' if 'limit' in request.args else 'per_page')
+            before = request.args.get('before')
+            if before:
+                try:
+                    before_ts = parse_utc_timestamp(before)
+                except ValueError:
+                    return err("Parameter before harus berupa timestamp ISO 8601", 400)
+                query += lambda s: s.where(Transaction.timestamp < before_ts)
+            cursor = request.args.get('cursor')
+            if cursor:
+                try:
+                    cursor_ts, cursor_id = decode_transaction_cursor(cursor)
+                except ValueError:
+                    return err("Cursor tidak valid", 400)
+                # Keyset: lanjut tepat setelah baris terakhir halaman sebelumnya, tanpa OFFSET
+                query += lambda s: s.where(or_(
+                    Transaction.timestamp < cursor_ts,
+                    and_(Transaction.timestamp == cursor_ts, Transaction.id < cursor_id)
+                ))
+
+        # Urutkan berdasarkan timestamp terbaru (id sebagai pemecah seri untuk timestamp yang sama)
+        query += lambda s: s.order_by(Transaction.timestamp.desc(), Transaction.id.desc())
+        if not paginated:
+            # Seluruh riwayat: di-stream per batch, bukan dikumpulkan dulu di satu list
+            return stream_json_array(
+                db.session.execute(query, execution_options={'yield_per': STREAM_BATCH_SIZE})
+            )
+
+        limit = per_page + 1
+        query += lambda s: s.limit(limit)
+        transactions = db.session.execute(query).all()
+
+        has_more = len(transactions) > per_page
+        return fast_json({
+            'items': [t._asdict() for t in transactions[:per_page]],
+            'next_cursor': encode_transaction_cursor(transactions[per_page - 1]) if has_more else None
+        })
 
     except Exception as e:
         app.logger.error(f"Error fetching transactions: {e}")
-        return jsonify({"error": "Gagal mengambil data transaksi"}), 500
+        return err("Gagal mengambil data transaksi", 500)
+
+def select_transaction_rows():
+    """SELECT kolom transaksi + nama item (JOIN) dengan label yang sudah sama dengan key JSON API,
+    sehingga tiap baris langsung jadi dict lewat Row._asdict() tanpa menyusun dict per key."""
+    return select(
+        Transaction.id, Transaction.type, Transaction.item_id,
+        InventoryItem.name.label('item_name'), Transaction.quantity,
+        Transaction.user_username.label('user'), Transaction.timestamp, Transaction.notes
+    ).join(InventoryItem, Transaction.item_id == InventoryItem.id)
+
+def record_stock_transaction(transaction_type, item_id, quantity, notes, username):
+    """Simpan satu baris Transaction setelah stok item di-UPDATE, dalam transaksi DB yang sama.
+    Respons dibaca kembali dalam satu SELECT (nama item & timestamp diisi DB) dengan bentuk yang sama
+    seperti GET /api/transactions. Tidak ada objek ORM yang dibuat."""
+    # INSERT Core langsung ke tabel: tanpa objek ORM, flush unit-of-work, maupun identity map.
+    # id diambil dari lastrowid driver (MySQL tidak punya INSERT ... RETURNING)
+    result = db.session.execute(insert(Transaction.__table__).values(
+        type=transaction_type,
+        item_id=item_id,
+        quantity=quantity,
+        user_username=username,
+        notes=notes
+    ))
+    transaction_id = result.inserted_primary_key[0]
+    return db.session.execute(lambda_stmt(
+        lambda: select_transaction_rows().where(Transaction.id == transaction_id)
+    )).one()._asdict()
 
 @app.route('/api/transactions/incoming', methods=['POST'])
-@login_required
 @role_required(['admin', 'operator'])
 def api_add_incoming_transaction():
     """API Endpoint untuk menambah transaksi barang masuk."""
-    if not request.is_json:
-        return jsonify({"error": "Request harus dalam format JSON"}), 400
-
-    data = request.get_json()
-    item_id = data.get('item_id')
-    quantity_str = data.get('quantity') # Ambil sebagai string dulu
-    notes = data.get('notes', '')
-
-    # Validasi input
-    if not item_id or not quantity_str:
-        return jsonify({"error": "ID Item dan Jumlah Masuk harus diisi"}), 400
-
-    try:
-        quantity = int(quantity_str)
-        if quantity <= 0:
-            return jsonify({"error": "Jumlah Masuk harus lebih dari 0"}), 400
-    except (ValueError, TypeError):
-        return jsonify({"error": "Jumlah Masuk harus berupa angka bulat positif"}), 400
-
-    try:
-        # Cari item inventaris
-        item = InventoryItem.query.get(item_id)
-        if not item:
-            return jsonify({"error": f"Item dengan ID {item_id} tidak ditemukan"}), 404
-
-        # Dapatkan username dari session
-        current_user = session.get('user', {}).get('username')
-        if not current_user:
-            return jsonify({"error": "Sesi pengguna tidak valid"}), 401
-
-        # Buat transaksi baru dan update stok dalam satu sesi DB
-        new_transaction = Transaction(
-            type='masuk',
-            item_id=item_id,
-            quantity=quantity,
-            user_username=current_user,
-            timestamp=datetime.utcnow(),
-            notes=notes
+    data = get_json_body()
+    if data is None:
+        return not_json_error()
+
+    item_id, quantity, notes, error = parse_transaction_input(data, 'Masuk')
+    if error:
+        return err(error, 400)
+
+    # Username dari user yang sudah divalidasi role_required
+    current_user = g.current_user['username']
+
+    # Commit di akhir blok; abort(err(...)) dan error database membuat blok di-rollback
+    with atomic():
+        # Tambah stok secara atomik di database (UPDATE ... SET quantity = quantity + :q),
+        # bukan baca-ubah-tulis di Python yang bisa kehilangan update saat request bersamaan
+        result = db.session.execute(
+            update(InventoryItem)
+            .where(InventoryItem.id == item_id)
+            .values(quantity=InventoryItem.quantity + quantity)
+            .execution_options(synchronize_session=False)
         )
+        if result.rowcount == 0:
+            abort(err(f"Item dengan ID {item_id} tidak ditemukan", 404))
 
-        # Update kuantitas item
-        item.quantity += quantity
-
-        db.session.add(new_transaction)
-        # item sudah di-track oleh session karena kita load & modifikasi
-        db.session.commit()
-
-        # Return data transaksi yang baru dibuat
-        transaction_data = {
-            'id': new_transaction.id,
-            'type': new_transaction.type,
-            'item_id': new_transaction.item_id,
-            'item_name': item.name, # Sertakan nama item
-            'quantity': new_transaction.quantity,
-            'user': new_transaction.user_username,
-            'timestamp': new_transaction.timestamp.strftime('%Y-%m-%d %H:%M:%S'),
-            'notes': new_transaction.notes
-        }
-        return jsonify(transaction_data), 201
-
-    except Exception as e:
-        db.session.rollback()
-        app.logger.error(f"Error adding incoming transaction for item {item_id}: {e}")
-        return jsonify({"error": "Gagal mencatat transaksi barang masuk"}), 500
+        # Catat transaksi dalam transaksi DB yang sama dengan update stok
+        transaction_data = record_stock_transaction('masuk', item_id, quantity, notes, current_user)
+    invalidate_inventory_cache()
+    return fast_json(transaction_data, 201)
 
 @app.route('/api/transactions/outgoing', methods=['POST'])
-@login_required
 @role_required(['admin', 'operator'])
 def api_add_outgoing_transaction():
     """API Endpoint untuk menambah transaksi barang keluar."""
-    if not request.is_json:
-        return jsonify({"error": "Request harus dalam format JSON"}), 400
-
-    data = request.get_json()
-    item_id = data.get('item_id')
-    quantity_str = data.get('quantity')
-    notes = data.get('notes', '')
-
-    # Validasi input
-    if not item_id or not quantity_str:
-        return jsonify({"error": "ID Item dan Jumlah Keluar harus diisi"}), 400
-
-    try:
-        quantity = int(quantity_str)
-        if quantity <= 0:
-            return jsonify({"error": "Jumlah Keluar harus lebih dari 0"}), 400
-    except (ValueError, TypeError):
-        return jsonify({"error": "Jumlah Keluar harus berupa angka bulat positif"}), 400
-
-    try:
-        # Cari item inventaris
-        item = InventoryItem.query.get(item_id)
-        if not item:
-            return jsonify({"error": f"Item dengan ID {item_id} tidak ditemukan"}), 404
-
-        # Cek stok mencukupi
-        if item.quantity < quantity:
-            return jsonify({"error": f"Stok tidak mencukupi. Stok saat ini: {item.quantity}"}), 400
-
-        # Dapatkan username dari session
-        current_user = session.get('user', {}).get('username')
-        if not current_user:
-            return jsonify({"error": "Sesi pengguna tidak valid"}), 401
-
-        # Buat transaksi baru dan update stok dalam satu sesi DB
-        new_transaction = Transaction(
-            type='keluar',
-            item_id=item_id,
-            quantity=quantity,
-            user_username=current_user,
-            timestamp=datetime.utcnow(),
-            notes=notes
+    data = get_json_body()
+    if data is None:
+        return not_json_error()
+
+    item_id, quantity, notes, error = parse_transaction_input(data, 'Keluar')
+    if error:
+        return err(error, 400)
+
+    # Username dari user yang sudah divalidasi role_required
+    current_user = g.current_user['username']
+
+    # Commit di akhir blok; abort(err(...)) dan error database membuat blok di-rollback
+    with atomic():
+        # Kurangi stok secara atomik; syarat quantity >= :q ikut di WHERE sehingga
+        # pengecekan stok dan pengurangan tidak bisa diselip request lain (tanpa lock baris manual)
+        result = db.session.execute(
+            update(InventoryItem)
+            .where(InventoryItem.id == item_id, InventoryItem.quantity >= quantity)
+            .values(quantity=InventoryItem.quantity - quantity)
+            .execution_options(synchronize_session=False)
         )
+        if result.rowcount == 0:
+            # Bedakan item tidak ada vs stok tidak mencukupi (hanya di jalur gagal)
+            current_stock = db.session.scalar(lambda_stmt(lambda: select(InventoryItem.quantity).where(InventoryItem.id == item_id)))
+            if current_stock is None:
+                abort(err(f"Item dengan ID {item_id} tidak ditemukan", 404))
+            abort(err(f"Stok tidak mencukupi. Stok saat ini: {current_stock}", 400))
 
-        # Update kuantitas item
-        item.quantity -= quantity
-
-        db.session.add(new_transaction)
-        db.session.commit()
+        # Catat transaksi dalam transaksi DB yang sama dengan update stok
+        transaction_data = record_stock_transaction('keluar', item_id, quantity, notes, current_user)
+    invalidate_inventory_cache()
+    return fast_json(transaction_data, 201)
 
-        # Return data transaksi yang baru dibuat
-        transaction_data = {
-            'id': new_transaction.id,
-            'type': new_transaction.type,
-            'item_id': new_transaction.item_id,
-            'item_name': item.name,
-            'quantity': new_transaction.quantity,
-            'user': new_transaction.user_username,
-            'timestamp': new_transaction.timestamp.strftime('%Y-%m-%d %H:%M:%S'),
-            'notes': new_transaction.notes
-        }
-        return jsonify(transaction_data), 201
+BULK_TRANSACTION_MAX_ROWS = 5000
 
-    except Exception as e:
-        db.session.rollback()
-        app.logger.error(f"Error adding outgoing transaction for item {item_id}: {e}")
-        return jsonify({"error": "Gagal mencatat transaksi barang keluar"}), 500
+@app.route('/api/transactions/bulk', methods=['POST'])
+@role_required(['admin', 'operator'])
+def api_add_bulk_transactions():
+    """API Endpoint untuk mencatat banyak transaksi masuk/keluar sekaligus.
+    Body: array [{'type': 'masuk'|'keluar', 'item_id', 'quantity', 'notes'}, ...], diproses berurutan
+    dalam satu transaksi DB (semua berhasil atau tidak sama sekali)."""
+    # Body di-parse bertahap dari stream: tiap elemen langsung divalidasi dan disimpan sebagai tuple
+    # ringkas, jadi list dict hasil parse penuh tidak pernah ada di memori bersamaan dengan `rows`,
+    # dan body yang melebihi batas baris ditolak tanpa membaca sisanya
+    rows = []
+    try:
+        entries = iter_json_array_body()
+        if entries is None:
+            return not_json_error()
+        for index, entry in enumerate(entries, start=1):
+            if index > BULK_TRANSACTION_MAX_ROWS:
+                return err(f"Maksimal {BULK_TRANSACTION_MAX_ROWS} transaksi per request", 400)
+            if not isinstance(entry, dict):
+                return err(f"Transaksi ke-{index}: harus berupa objek", 400)
+            transaction_type = entry.get('type')
+            if not isinstance(transaction_type, str) or transaction_type not in TRANSACTION_TYPE_LABELS:
+                return err(f"Transaksi ke-{index}: type harus 'masuk' atau 'keluar'", 400)
+            item_id, quantity, notes, error = parse_transaction_input(entry, TRANSACTION_TYPE_LABELS[transaction_type])
+            if error:
+                return err(f"Transaksi ke-{index}: {error}", 400)
+            rows.append((transaction_type, item_id, quantity, notes))
+    except ijson.JSONError:
+        return not_json_error()
+    except ValueError:
+        return err("Body harus berupa array transaksi yang tidak kosong", 400)
+    if not rows:
+        return err("Body harus berupa array transaksi yang tidak kosong", 400)
+
+    current_user = g.current_user['username']
+
+    # Validasi stok gagal -> abort di dalam blok (rollback, lock dilepas).
+    # Error database di-rollback lalu dijawab 500 oleh handle_database_error
+    with atomic():
+        # Semua item yang dirujuk dikunci & dibaca dalam SATU query (bukan satu SELECT per transaksi),
+        # sehingga cek stok di Python aman dari request lain sampai commit
+        item_ids = {item_id for _, item_id, _, _ in rows}
+        stock = dict(db.session.execute(
+            select(InventoryItem.id, InventoryItem.quantity)
+            .where(InventoryItem.id.in_(item_ids))
+            .with_for_update()
+        ).all())
+
+        # Proses berurutan: transaksi keluar boleh memakai stok dari transaksi masuk sebelumnya
+        deltas = {}
+        for index, (transaction_type, item_id, quantity, _) in enumerate(rows, start=1):
+            if item_id not in stock:
+                abort(err(f"Transaksi ke-{index}: Item dengan ID {item_id} tidak ditemukan", 404))
+            delta = quantity if transaction_type == 'masuk' else -quantity
+            if stock[item_id] + delta < 0:
+                abort(err(f"Transaksi ke-{index}: Stok tidak mencukupi. Stok saat ini: {stock[item_id]}", 400))
+            stock[item_id] += delta
+            deltas[item_id] = deltas.get(item_id, 0) + delta
+
+        # Satu UPDATE per item (executemany), bukan per transaksi; last_update diisi onupdate NOW()
+        changed = [{'b_id': item_id, 'delta': delta} for item_id, delta in deltas.items() if delta]
+        if changed:
+            item_table = InventoryItem.__table__
+            db.session.execute(
+                update(item_table)
+                .where(item_table.c.id == bindparam('b_id'))
+                .values(quantity=item_table.c.quantity + bindparam('delta')),
+                changed
+            )
+        # Semua baris transaksi dalam satu INSERT multi-baris; timestamp diisi server_default NOW()
+        db.session.execute(insert(Transaction), [
+            {'type': transaction_type, 'item_id': item_id, 'quantity': quantity,
+             'user_username': current_user, 'notes': notes}
+            for transaction_type, item_id, quantity, notes in rows
+        ])
+    invalidate_inventory_cache()
+    return fast_json({
+        "message": f"{len(rows)} transaksi berhasil dicatat",
+        "created": len(rows),
+        "items": [{'id': item_id, 'quantity': stock[item_id]} for item_id in deltas]
+    }, 201)
 
 # --- Fungsi Inisialisasi Database ---
 def init_db():
@@ -856,18 +1344,32 @@ def init_db():
             db.create_all()
             print("Tabel berhasil dibuat (atau sudah ada).")
 
-            # Opsional: Tambah user admin default jika tabel baru dibuat & user admin belum ada
-            if not User.query.filter_by(username='admin').first():
-                print("Membuat user admin default...")
-                admin_user = User(username='admin', role='admin', name='Admin Utama')
-                admin_pass = os.environ.get('ADMIN_DEFAULT_PASSWORD', 'adminpass')
-                if not admin_pass:
-                    print("PERINGATAN: ADMIN_DEFAULT_PASSWORD tidak diatur, menggunakan 'adminpass' default yang lemah.")
-                    admin_pass = 'adminpass'
-                admin_user.set_password(admin_pass)
-                db.session.add(admin_user)
-                db.session.commit()
-                print("User admin default berhasil dibuat.")
+            # create_all tidak menyentuh tabel yang sudah ada, jadi index baru di model dibuat terpisah
+            for table in db.metadata.sorted_tables:
+                for index in table.indexes:
+                    index.create(db.engine, checkfirst=True)
+
+            # Opsional: Tambah user admin default jika belum ada
+            admin_pass = os.environ.get('ADMIN_DEFAULT_PASSWORD', 'adminpass')
+            if not admin_pass:
+                print("PERINGATAN: ADMIN_DEFAULT_PASSWORD tidak diatur, menggunakan 'adminpass' default yang lemah.")
+                admin_pass = 'adminpass'
+            # Core insert dengan list dict: user seed tambahan cukup ditambahkan ke list ini
+            # dan tetap dikirim sebagai satu INSERT multi-baris
+            seed_users = [
+                {'username': 'admin', 'role': 'admin', 'name': 'Admin Utama',
+                 'password_hash': password_hasher.hash(admin_pass)},
+            ]
+            # INSERT IGNORE: username yang sudah ada dilewati oleh unique index, tanpa SELECT cek dulu
+            # (satu round-trip, aman jika beberapa worker menjalankan init-db bersamaan).
+            # Data seed konstan dan valid, jadi IGNORE tidak menyembunyikan error lain.
+            result = db.session.execute(
+                insert(User.__table__).prefix_with('IGNORE', dialect='mysql').prefix_with('OR IGNORE', dialect='sqlite'),
+                seed_users
+            )
+            db.session.commit()
+            if result.rowcount:
+                print(f"{result.rowcount} user default berhasil dibuat.")
         except Exception as e:
             print(f"Error saat membuat tabel atau user admin: {e}")
             db.session.rollback()
@@ -878,6 +1380,67 @@ def initialize_database():
     """Membuat tabel database."""
     init_db()
 
+IMPORT_BATCH_SIZE = 1000
+
+@app.cli.command("import-inventory")
+@click.argument('csv_path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--added-by', default='admin', help="Username yang dicatat sebagai added_by.")
+def import_inventory(csv_path, added_by):
+    """Impor item dari CSV (kolom: id, name, category, quantity). ID yang sudah ada dilewati.
+    Baris dengan quantity bukan bilangan bulat atau negatif dilaporkan dan dilewati.
+    Seluruh impor berjalan dalam satu transaksi: jika ada ID yang dibuat proses lain di antara
+    cek ID dan INSERT (IntegrityError), tidak ada item yang disimpan; jalankan ulang perintah
+    (ID yang sudah ada akan dilewati)."""
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        rows = []
+        for line_no, row in enumerate(csv.DictReader(f), start=2):
+            item_id = (row.get('id') or '').strip().upper()
+            name = (row.get('name') or '').strip()
+            if not item_id or not name:
+                print(f"Baris {line_no} dilewati: id dan name harus diisi")
+                continue
+            try:
+                quantity = int(row.get('quantity') or 0)
+            except ValueError:
+                print(f"Baris {line_no} dilewati: quantity '{row.get('quantity')}' bukan angka bulat")
+                continue
+            if quantity < 0:
+                print(f"Baris {line_no} dilewati: quantity tidak boleh negatif ({quantity})")
+                continue
+            rows.append({
+                'id': item_id,
+                'name': name,
+                'category': (row.get('category') or '').strip(),
+                'quantity': quantity,
+                'added_by': added_by,
+            })
+
+    # ID duplikat di dalam file: ambil baris terakhir
+    rows = list({row['id']: row for row in rows}.values())
+    imported = 0
+    try:
+        for start in range(0, len(rows), IMPORT_BATCH_SIZE):
+            batch = rows[start:start + IMPORT_BATCH_SIZE]
+            existing = set(db.session.scalars(
+                select(InventoryItem.id).where(InventoryItem.id.in_([row['id'] for row in batch]))
+            ))
+            batch = [row for row in batch if row['id'] not in existing]
+            if batch:
+                # Satu INSERT multi-baris per batch, bukan session.add() per item
+                db.session.execute(insert(InventoryItem), batch)
+                imported += len(batch)
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        print("Impor dibatalkan: ada ID yang baru saja ditambahkan proses lain. Jalankan ulang perintah; ID yang sudah ada akan dilewati.")
+        return
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error saat impor inventory: {e}")
+        return
+    invalidate_inventory_cache()
+    print(f"{imported} item berhasil diimpor ({len(rows) - imported} sudah ada).")
+
 # --- Run Flask App (Hanya untuk menjalankan langsung dengan python app.py) ---
 if __name__ == '__main__':
     # Perintah init-db sudah dipindah keluar dari sini
@@ -13,6 +13,12 @@ document.addEventListener('DOMContentLoaded', function() {
     function formatNumber(num) {
         return new Intl.NumberFormat('id-ID').format(num);
     }
+    // Format timestamp ISO 8601 dari API (UTC) ke waktu lokal
+    function formatDateTime(value) {
+        if (!value) return '-';
+        const date = new Date(value);
+        return isNaN(date) ? value : date.toLocaleString('id-ID');
+    }
     function createSpinner(message = 'Loading...', small = false) {
          const sizeClass = small ? 'spinner-border-sm' : '';
          return `<div class="d-flex justify-content-center align-items-center text-secondary my-3"><div class="spinner-border ${sizeClass}" role="status"><span class="visually-hidden">${message}</span></div><span class="ms-2">${message}</span></div>`;
@@ -103,7 +109,7 @@ document.addEventListener('DOMContentLoaded', function() {
                     <td><code>${tx.item_id}</code></td>
                     <td class="text-end">+${formatNumber(tx.quantity)}</td>
                      <td>${tx.user || '-'}</td>
-                    <td><small>${tx.timestamp || '-'}</small></td>
+                    <td><small>${formatDateTime(tx.timestamp)}</small></td>
                      <td><small>${tx.notes || '-'}</small></td>
                 </tr>`;
         });
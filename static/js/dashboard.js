@@ -8,6 +8,13 @@ document.addEventListener('DOMContentLoaded', function() {
         return new Intl.NumberFormat('id-ID').format(num);
     }
 
+    // Fungsi format tanggal ISO 8601 dari API ke waktu lokal
+    function formatDateTime(value) {
+        if (!value) return '-';
+        const date = new Date(value);
+        return isNaN(date) ? value : date.toLocaleString('id-ID');
+    }
+
     // Fungsi untuk mengambil data summary dari API
     function fetchSummaryData() {
          // Pastikan container ada sebelum fetch
@@ -142,7 +149,7 @@ document.addEventListener('DOMContentLoaded', function() {
                     <td><code>${tx.item_id}</code></td>
                     <td>${formatNumber(tx.quantity)}</td>
                     <td>${tx.user_username || '-'}</td>
-                    <td><small>${tx.timestamp || '-'}</small></td>
+                    <td><small>${formatDateTime(tx.timestamp)}</small></td>
                      <td><small>${tx.notes || '-'}</small></td>
                 </tr>
             `;
@@ -6,6 +6,13 @@ document.addEventListener('DOMContentLoaded', function() {
     function formatNumber(num) {
         return new Intl.NumberFormat('id-ID').format(num);
     }
+
+    // Format timestamp ISO 8601 dari API (UTC) ke waktu lokal
+    function formatDateTime(value) {
+        if (!value) return '-';
+        const date = new Date(value);
+        return isNaN(date) ? value : date.toLocaleString('id-ID');
+    }
     
      // Fungsi membuat elemen spinner Bootstrap
     function createSpinner(message = 'Loading...') {
@@ -80,7 +87,7 @@ document.addEventListener('DOMContentLoaded', function() {
                     <td>${item.category || '-'}</td>
                     <td class="text-end ${quantityClass}">${formatNumber(item.quantity)}</td>
                     <td>${item.added_by || '-'}</td>
-                    <td><small>${item.last_update || '-'}</small></td>
+                    <td><small>${formatDateTime(item.last_update)}</small></td>
                      </tr>
             `;
         });
@@ -0,0 +1,78 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Konfigurasi harus diatur sebelum app.py di-import (dibaca saat import modul):
+# SQLite lokal menggantikan MySQL, tanpa Redis, dan biaya argon2 minimum agar test cepat
+_db_dir = tempfile.mkdtemp(prefix='uts_eai_test_')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_db_dir, 'test.db')}"
+os.environ.pop('REDIS_URL', None)
+os.environ['ADMIN_DEFAULT_PASSWORD'] = 'adminpass'
+os.environ['ARGON2_TIME_COST'] = '1'
+os.environ['ARGON2_MEMORY_COST'] = '1024'
+os.environ['ARGON2_PARALLELISM'] = '1'
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module  # noqa: E402
+
+
+@pytest.fixture
+def app():
+    """App Flask dengan database SQLite kosong (tabel + user admin default) dan cache bersih per test."""
+    flask_app = app_module.app
+    flask_app.config['TESTING'] = True
+    with flask_app.app_context():
+        app_module.db.drop_all()
+    app_module.init_db()
+    app_module.cache.clear()
+    yield flask_app
+    with flask_app.app_context():
+        app_module.db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    """Test client yang sudah login sebagai admin (boleh mengakses semua endpoint API)."""
+    test_client = app.test_client()
+    response = test_client.post('/login', data={'username': 'admin', 'password': 'adminpass'})
+    assert response.status_code == 302
+    return test_client
+
+
+@pytest.fixture
+def seeded_client(client):
+    """Client admin dengan beberapa item dan transaksi, cukup untuk memperlihatkan pola N+1
+    (jumlah query yang tumbuh per baris) pada endpoint daftar."""
+    for i in range(5):
+        response = client.post('/api/inventory', json={
+            'item_id': f'ITEM{i:03d}', 'name': f'Barang {i}', 'category': 'umum', 'quantity': 20,
+        })
+        assert response.status_code == 201
+        for _ in range(2):
+            response = client.post('/api/transactions/incoming', json={'item_id': f'ITEM{i:03d}', 'quantity': 3})
+            assert response.status_code == 201
+        response = client.post('/api/transactions/outgoing', json={'item_id': f'ITEM{i:03d}', 'quantity': 1})
+        assert response.status_code == 201
+    app_module.cache.clear()
+    return client
+
+
+@pytest.fixture
+def count_queries(app):
+    """`with count_queries() as q: ...` mencatat statement SQL yang dikirim ke engine selama blok."""
+    with app.app_context():
+        engine = app_module.db.engine
+    return lambda: app_module.count_queries(engine)
+
+
+@pytest.fixture
+def strict_loading(app):
+    """Aktifkan mode debug agar transaction_load_options menambahkan raiseload('*'):
+    akses relasi yang tidak di-eager-load langsung error alih-alih diam-diam menjalankan query lazy."""
+    previous_debug = app.debug
+    app.debug = True
+    yield app
+    app.debug = previous_debug
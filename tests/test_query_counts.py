@@ -0,0 +1,56 @@
+"""Batas jumlah statement SQL per request untuk endpoint daftar & dashboard.
+
+Jumlah query harus konstan (tidak tumbuh per baris data) agar N+1 tidak kembali setelah refactor.
+Tanpa REDIS_URL setiap request API juga memvalidasi user session ke DB (satu SELECT User),
+sehingga semua batas di bawah sudah termasuk query tersebut.
+"""
+import pytest
+from sqlalchemy import select
+from sqlalchemy.exc import InvalidRequestError
+
+import app as app_module
+
+
+@pytest.mark.parametrize('url, max_queries', [
+    ('/api/transactions', 2),
+    ('/api/transactions?type=masuk', 2),
+    ('/api/transactions?per_page=5', 2),
+    ('/api/inventory', 2),
+    ('/api/inventory?page=1&per_page=2', 2),
+    ('/api/inventory/ITEM001', 2),
+    ('/api/users', 2),
+    ('/api/dashboard/summary', 3),
+])
+def test_list_endpoints_query_count(seeded_client, count_queries, url, max_queries):
+    with count_queries() as queries:
+        response = seeded_client.get(url)
+        # Daftar transaksi tanpa pagination di-stream: query baru jalan saat body dibaca
+        response.get_data()
+    assert response.status_code == 200
+    assert len(queries) <= max_queries, queries
+
+
+def test_transactions_stream_returns_all_rows(seeded_client):
+    transactions = seeded_client.get('/api/transactions').get_json()
+    assert len(transactions) == 15
+    assert all(t['item_name'] for t in transactions)
+
+
+def test_dashboard_recent_activity_without_lazy_loads(seeded_client, count_queries, strict_loading):
+    with count_queries() as queries:
+        response = seeded_client.get('/api/dashboard/summary')
+    assert response.status_code == 200
+    recent = response.get_json()['recent_activity']
+    assert len(recent) == 5
+    assert all(t['item_name'].startswith('Barang') for t in recent)
+    assert len(queries) <= 3, queries
+
+
+def test_strict_loading_rejects_unloaded_relationship(app, seeded_client, strict_loading):
+    with app.app_context():
+        transaction = app_module.db.session.scalars(
+            select(app_module.Transaction).options(*app_module.transaction_load_options()).limit(1)
+        ).first()
+        assert transaction.item.name
+        with pytest.raises(InvalidRequestError):
+            transaction.user_obj
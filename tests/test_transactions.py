@@ -0,0 +1,91 @@
+"""Pagination keyset GET /api/transactions (?per_page=&cursor=, ?limit=&before=) dan validasi input transaksi."""
+import pytest
+from flask import abort
+from sqlalchemy import update
+from werkzeug.exceptions import HTTPException
+
+import app as app_module
+
+
+def _follow_cursor(client, url):
+    ids = []
+    cursor = None
+    for _ in range(50):
+        response = client.get(url + (f'&cursor={cursor}' if cursor else ''))
+        assert response.status_code == 200
+        page = response.get_json()
+        ids += [t['id'] for t in page['items']]
+        cursor = page['next_cursor']
+        if not cursor:
+            return ids
+    raise AssertionError(f"Cursor tidak pernah habis, id sejauh ini: {ids}")
+
+
+def test_cursor_pages_have_no_duplicates_or_gaps(seeded_client):
+    # Seed dibuat dalam waktu singkat, jadi banyak transaksi berbagi timestamp (resolusi detik):
+    # urutan antar halaman harus ditentukan oleh id sebagai pemecah seri
+    all_ids = [t['id'] for t in seeded_client.get('/api/transactions').get_json()]
+    assert _follow_cursor(seeded_client, '/api/transactions?per_page=2') == all_ids
+    assert len(set(all_ids)) == len(all_ids) == 15
+
+
+def test_cursor_pages_with_type_filter(seeded_client):
+    incoming_ids = [t['id'] for t in seeded_client.get('/api/transactions?type=masuk').get_json()]
+    assert _follow_cursor(seeded_client, '/api/transactions?type=masuk&limit=3') == incoming_ids
+    assert len(incoming_ids) == 10
+
+
+def test_before_excludes_rows_at_that_timestamp(seeded_client):
+    transactions = seeded_client.get('/api/transactions').get_json()
+    newest = transactions[0]['timestamp']
+    page = seeded_client.get('/api/transactions', query_string={'before': newest, 'per_page': 500}).get_json()
+    assert all(t['timestamp'] < newest for t in page['items'])
+    assert len(page['items']) == sum(1 for t in transactions if t['timestamp'] < newest)
+
+
+def test_invalid_cursor_and_before(seeded_client):
+    assert seeded_client.get('/api/transactions?cursor=bukan-cursor').status_code == 400
+    assert seeded_client.get('/api/transactions?before=kemarin').status_code == 400
+
+
+@pytest.mark.parametrize('quantity', [True, 1.9, '1.5', 'abc', [1]])
+def test_non_integer_quantity_is_rejected(seeded_client, quantity):
+    response = seeded_client.post('/api/transactions/incoming', json={'item_id': 'ITEM000', 'quantity': quantity})
+    assert response.status_code == 400
+    assert response.get_json()['error'] == "Jumlah Masuk harus berupa angka bulat positif"
+    response = seeded_client.post('/api/transactions/bulk', json=[{'type': 'keluar', 'item_id': 'ITEM000', 'quantity': quantity}])
+    assert response.status_code == 400
+    assert response.get_json()['error'] == "Transaksi ke-1: Jumlah Keluar harus berupa angka bulat positif"
+
+
+@pytest.mark.parametrize('quantity, expected', [(2, 2), (2.0, 2), ('3', 3)])
+def test_integer_quantity_forms_are_accepted(seeded_client, quantity, expected):
+    response = seeded_client.post('/api/transactions/incoming', json={'item_id': 'ITEM000', 'quantity': quantity})
+    assert response.status_code == 201
+    assert response.get_json()['quantity'] == expected
+
+
+def test_abort_inside_atomic_rolls_back_writes(app, seeded_client):
+    with app.test_request_context():
+        stock = app_module.fetch_item_row('ITEM000').quantity
+        with pytest.raises(HTTPException) as excinfo:
+            with app_module.atomic():
+                app_module.db.session.execute(
+                    update(app_module.InventoryItem)
+                    .where(app_module.InventoryItem.id == 'ITEM000')
+                    .values(quantity=app_module.InventoryItem.quantity + 100)
+                )
+                abort(app_module.err("gagal", 400))
+        assert excinfo.value.get_response().status_code == 400
+        assert app_module.fetch_item_row('ITEM000').quantity == stock
+
+
+def test_failed_bulk_row_leaves_stock_unchanged(seeded_client):
+    before = seeded_client.get('/api/inventory/ITEM000').get_json()['quantity']
+    response = seeded_client.post('/api/transactions/bulk', json=[
+        {'type': 'masuk', 'item_id': 'ITEM000', 'quantity': 5},
+        {'type': 'keluar', 'item_id': 'ITEM000', 'quantity': before + 100},
+    ])
+    assert response.status_code == 400
+    assert response.get_json()['error'].startswith("Transaksi ke-2: Stok tidak mencukupi")
+    assert seeded_client.get('/api/inventory/ITEM000').get_json()['quantity'] == before